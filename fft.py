@@ -12,14 +12,338 @@ Determines the file type of files using filesystem, magic, and language tests.
 
 __version__ = "1.3.0"
 
-import argparse
-import mimetypes
+import collections
+import functools
 import os
+import queue
 import re
+import stat
 import sys
-from pathlib import Path
+import threading
+from typing import Any, Dict, List, Tuple
+
+# magic, mimetypes, argparse, concurrent.futures and the optional re2 are
+# imported where they are first needed, so that --help, --version and usage
+# errors do not pay for loading them
+
+# Any byte outside 7-bit ASCII
+_NON_ASCII = re.compile(rb"[^\x00-\x7f]")
+
+# Runs of non-ASCII characters in decoded text
+_NON_ASCII_CHARS = re.compile("[^\x00-\x7f]+")
+
+# Byte order mark some editors write at the start of UTF-8 files
+_UTF8_BOM = b"\xef\xbb\xbf"
+
+# ASCII bytes that str.isprintable() or str.isspace() accept
+_PRINTABLE_ASCII = bytes(range(0x20, 0x7F)) + b"\t\n\v\f\r\x1c\x1d\x1e\x1f"
+
+# Language tests look at the first 1024 characters of a file, as decoded
+# UTF-8 text with newlines translated. UTF-8 takes at most 4 bytes per
+# character, so that many bytes are read to cover them.
+_HEADER_CHARS = 1024
+_HEADER_BYTES = 4 * _HEADER_CHARS
+
+# Maximum number of libmagic results kept per FileTypeTester
+_MAGIC_CACHE_SIZE = 4096
+
+# Names read from a namefile are processed in batches of this size, so that
+# output starts before the whole namefile has been read
+_NAMEFILE_BATCH_SIZE = 1024
+
+# File lists longer than this are detected on a thread pool
+_PARALLEL_MIN_FILES = 8
+
+# Number of result lines main() collects before writing them to stdout
+_OUTPUT_BATCH_SIZE = 1024
+
+# Content patterns for language tests: (regex, literals, file type, MIME type).
+# Order matters: the first pattern that matches wins. Every pattern is matched
+# at the start of a line, so non-matching lines are rejected after a few
+# characters. Patterns run case-sensitively on the lowercased content, so their
+# letters must be lowercase. A regex is only run when the content contains at
+# least one of its literals; every alternative in the regex requires one of
+# them, so skipping is always safe. An empty literals tuple means the regex is
+# always run.
+_LANGUAGE_PATTERNS = (
+    (
+        r"#!/usr/bin/(?:env\s+)?python|import\s+\w+|from\s+\w+\s+import",
+        ("#!/usr/bin/", "import"),
+        "Python script",
+        "text/x-python",
+    ),
+    (
+        r"#!/bin/(?:bash|sh)|#\s*(?:bash|shell)",
+        ("sh",),
+        "shell script",
+        "text/x-shellscript",
+    ),
+    (
+        r"#!/usr/bin/env\s+node|(?:const|let|var)\s+\w+",
+        ("node", "const", "let", "var"),
+        "JavaScript file",
+        "text/javascript",
+    ),
+    (
+        r'#include\s*(?:<[^>\n]*>|"[^"\n]*")|int\s+main\s*\(',
+        ("#include", "main"),
+        "C/C++ source",
+        "text/x-c",
+    ),
+    (
+        r"package\s+\w+|public\s+class\s+\w+|import\s+java\.",
+        ("package", "class", "java."),
+        "Java source",
+        "text/x-java-source",
+    ),
+    (r"<\?(?:php|=)|\$\w+\s*=", ("<?", "$"), "PHP script", "text/x-php"),
+    (
+        r"(?:class|def|module)\s+\w+",
+        ("class", "def", "module"),
+        "Ruby script",
+        "text/x-ruby",
+    ),
+    (
+        r"<(?:!doctype html|html|head>|body>)",
+        ("<!doctype html", "<html", "<head>", "<body>"),
+        "HTML document",
+        "text/html",
+    ),
+    (r"\s*{", ("{",), "JSON data", "application/json"),
+    (r"<(?:\?xml|[a-z][^>]*>)", ("<",), "XML document", "application/xml"),
+)
+
+# Patterns that also match much ordinary text: (regex, literals, file type,
+# MIME type). They are only tried, in order, when no pattern above matched,
+# and a regex is only run when the content contains all of its literals.
+_WEAK_LANGUAGE_PATTERNS = (
+    (
+        r"[ \t]*(?:[\w-]+[ \t]*:[ \t]*[\w-]+|\.|#[a-z])",
+        ("{", "}", ":"),
+        "CSS stylesheet",
+        "text/css",
+    ),
+    (r"#+[ \t]+\w+", ("#",), "Markdown document", "text/markdown"),
+)
+
+
+@functools.lru_cache(maxsize=None)
+def _compile_language_patterns():
+    """
+    Compile the language pattern tables, once per process. Returns the compiled
+    strong and weak pattern lists, the combined regex, its group number to
+    pattern index mapping, and the RE2 build of the combined regex (None
+    without google-re2).
+    """
+    # Patterns run on the raw header bytes, so no decoding is needed
+    patterns, weak_patterns = [
+        [
+            (
+                re.compile(f"^(?:{pattern})".encode(), re.MULTILINE),
+                tuple(literal.encode() for literal in literals),
+                file_type,
+                mime_type,
+            )
+            for pattern, literals, file_type, mime_type in table
+        ]
+        for table in (_LANGUAGE_PATTERNS, _WEAK_LANGUAGE_PATTERNS)
+    ]
+
+    # All language patterns as one alternation, so a single scan over the
+    # content finds the leftmost match of any pattern. The line anchor is
+    # shared rather than repeated per pattern: re does not hoist it out of
+    # an alternation, and would otherwise try every pattern at every byte.
+    combined = (
+        "^(?:"
+        + "|".join(
+            f"(?P<lang{index}>{pattern})"
+            for index, (pattern, _, _, _) in enumerate(_LANGUAGE_PATTERNS)
+        )
+        + ")"
+    )
+    regex = re.compile(combined.encode(), re.MULTILINE)
+    # Keyed by group number rather than name: RE2 reports names as bytes
+    groups = {
+        regex.groupindex[f"lang{index}"]: index
+        for index in range(len(_LANGUAGE_PATTERNS))
+    }
+
+    # RE2 build of the combined pattern, used for ASCII headers when
+    # google-re2 is installed (RE2 reads bytes as UTF-8). On bytes Python's
+    # \s also matches \v, so spell that out for RE2 to find the same matches.
+    try:
+        # Optional: linear-time matching for the combined language pattern
+        import re2  # type: ignore
+    except ImportError:
+        re2 = None
+    regex_re2 = None
+    if re2 is not None:
+        regex_re2 = re2.compile(
+            ("(?m)" + combined.replace(r"\s", r"[\t\n\v\f\r ]")).encode()
+        )
 
-import magic
+    return patterns, weak_patterns, regex, groups, regex_re2
+
+
+# Pairs of libmagic detectors (MIME type, description) shared by all testers.
+# Each handle loads the whole magic database, so they are only created when
+# needed and then reused. A handle is used by one thread at a time: magic tests
+# take a pair from the queue for each file and put it back afterwards, and
+# create a new pair when every existing one is in use. There are never more
+# pairs than threads running magic tests at once. The queue holds (index, pair)
+# entries and hands out the free pair with the lowest index, so sequential
+# runs always use the first pair.
+_magic_detector_pairs: List[Tuple[Any, Any]] = []
+_magic_detectors: "queue.PriorityQueue[Tuple[int, Tuple[Any, Any]]]" = (
+    queue.PriorityQueue()
+)
+# Reentrant, so that reserving pairs can create them while holding it
+_magic_detector_lock = threading.RLock()
+
+
+def _new_magic_detectors():
+    """
+    Create and record a pair of libmagic detectors, not yet in the queue.
+    Returns its queue entry: the pair's index and the pair.
+    """
+    import magic
+
+    pair = (magic.Magic(magic.MAGIC_MIME_TYPE), magic.Magic(magic.MAGIC_NONE))
+    with _magic_detector_lock:
+        _magic_detector_pairs.append(pair)
+        return len(_magic_detector_pairs) - 1, pair
+
+
+def _reserve_magic_detectors(count):
+    """Make sure at least count pairs of libmagic detectors exist"""
+    # The pairs are created under the lock, so that threads reserving at the
+    # same time do not each create the missing pairs
+    with _magic_detector_lock:
+        while len(_magic_detector_pairs) < count:
+            _magic_detectors.put(_new_magic_detectors())
+
+
+# Extension to file type mapping
+_EXTENSION_MAP = {
+    ".txt": "text file",
+    ".py": "Python script",
+    ".js": "JavaScript file",
+    ".html": "HTML document",
+    ".css": "CSS stylesheet",
+    ".json": "JSON data",
+    ".xml": "XML document",
+    ".csv": "CSV data",
+    ".md": "Markdown document",
+    ".jpg": "JPEG image",
+    ".jpeg": "JPEG image",
+    ".png": "PNG image",
+    ".gif": "GIF image",
+    ".pdf": "PDF document",
+    ".zip": "ZIP archive",
+    ".tar": "TAR archive",
+    ".gz": "GZIP compressed file",
+    ".exe": "Windows executable",
+    ".dll": "Windows DLL",
+    ".so": "shared library",
+    ".a": "static library",
+    ".o": "object file",
+    ".c": "C source file",
+    ".cpp": "C++ source file",
+    ".h": "C/C++ header file",
+    ".hpp": "C++ header file",
+    ".go": "Go source file",
+    ".rs": "Rust source file",
+    ".java": "Java source file",
+    ".class": "Java bytecode",
+    ".rb": "Ruby script",
+    ".php": "PHP script",
+    ".sh": "shell script",
+    ".bat": "batch file",
+    ".ps1": "PowerShell script",
+}
+
+# MIME type mapping for filesystem tests
+_EXTENSION_MIME_MAP = {
+    ".txt": "text/plain",
+    ".py": "text/x-python",
+    ".js": "text/javascript",
+    ".html": "text/html",
+    ".css": "text/css",
+    ".json": "application/json",
+    ".xml": "application/xml",
+    ".csv": "text/csv",
+    ".md": "text/markdown",
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".png": "image/png",
+    ".gif": "image/gif",
+    ".pdf": "application/pdf",
+    ".zip": "application/zip",
+    ".tar": "application/x-tar",
+    ".gz": "application/gzip",
+    ".exe": "application/x-msdownload",
+    ".dll": "application/x-msdownload",
+    ".so": "application/x-sharedlib",
+    ".a": "application/x-archive",
+    ".o": "application/x-object",
+    ".c": "text/x-c",
+    ".cpp": "text/x-c++",
+    ".h": "text/x-c",
+    ".hpp": "text/x-c++",
+    ".go": "text/x-go",
+    ".rs": "text/x-rust",
+    ".java": "text/x-java-source",
+    ".class": "application/java-vm",
+    ".rb": "text/x-ruby",
+    ".php": "text/x-php",
+    ".sh": "text/x-shellscript",
+    ".bat": "text/x-msdos-batch",
+    ".ps1": "text/x-powershell",
+}
+
+# File type to MIME type mapping for special filesystem types
+_FILESYSTEM_MIME_MAP = {
+    "directory": "inode/directory",
+    "symbolic link": "inode/symlink",
+    "block device": "inode/blockdevice",
+    "character device": "inode/chardevice",
+    "FIFO (named pipe)": "inode/fifo",
+    "socket": "inode/socket",
+    "executable file": "application/x-executable",
+    "executable script": "text/x-shellscript",
+}
+
+# File types recognized from the lstat mode alone, besides symbolic links
+_SPECIAL_FILE_TYPES = {
+    stat.S_IFDIR: "directory",
+    stat.S_IFBLK: "block device",
+    stat.S_IFCHR: "character device",
+    stat.S_IFIFO: "FIFO (named pipe)",
+    stat.S_IFSOCK: "socket",
+}
+
+# Build reverse mapping for extension lookup, with each list sorted
+_TYPE_TO_EXTENSIONS: Dict[str, List[str]] = {}
+for _ext, _file_type in _EXTENSION_MAP.items():
+    if _file_type not in _TYPE_TO_EXTENSIONS:
+        _TYPE_TO_EXTENSIONS[_file_type] = []
+    _TYPE_TO_EXTENSIONS[_file_type].append(_ext)
+for _exts in _TYPE_TO_EXTENSIONS.values():
+    _exts.sort()
+
+# Slash-separated extension lists for --extension, without the leading dots
+_TYPE_TO_EXTENSION_LIST = {
+    _file_type: "/".join(ext[1:] for ext in _exts)
+    for _file_type, _exts in _TYPE_TO_EXTENSIONS.items()
+}
+
+# Detection tests in the order they run: (name, method name, reads content).
+# Methods are looked up on the instance at call time.
+_DETECTION_TESTS = (
+    ("Filesystem", "filesystem_tests", False),
+    ("Magic", "magic_tests", True),
+    ("Language", "language_tests", True),
+)
 
 
 class FileTypeTester:
@@ -34,432 +358,533 @@ class FileTypeTester:
         else:
             self.no_dereference = no_dereference
 
-        self.mime_detector = magic.Magic(magic.MAGIC_MIME_TYPE)
-        self.description_detector = magic.Magic(magic.MAGIC_NONE)
-
-        # Extension to file type mapping
-        self.extension_map = {
-            ".txt": "text file",
-            ".py": "Python script",
-            ".js": "JavaScript file",
-            ".html": "HTML document",
-            ".css": "CSS stylesheet",
-            ".json": "JSON data",
-            ".xml": "XML document",
-            ".csv": "CSV data",
-            ".md": "Markdown document",
-            ".jpg": "JPEG image",
-            ".jpeg": "JPEG image",
-            ".png": "PNG image",
-            ".gif": "GIF image",
-            ".pdf": "PDF document",
-            ".zip": "ZIP archive",
-            ".tar": "TAR archive",
-            ".gz": "GZIP compressed file",
-            ".exe": "Windows executable",
-            ".dll": "Windows DLL",
-            ".so": "shared library",
-            ".a": "static library",
-            ".o": "object file",
-            ".c": "C source file",
-            ".cpp": "C++ source file",
-            ".h": "C/C++ header file",
-            ".java": "Java source file",
-            ".class": "Java bytecode",
-            ".rb": "Ruby script",
-            ".php": "PHP script",
-            ".sh": "shell script",
-            ".bat": "batch file",
-            ".ps1": "PowerShell script",
-        }
-
-        # MIME type mapping for filesystem tests
-        self.extension_mime_map = {
-            ".txt": "text/plain",
-            ".py": "text/x-python",
-            ".js": "text/javascript",
-            ".html": "text/html",
-            ".css": "text/css",
-            ".json": "application/json",
-            ".xml": "application/xml",
-            ".csv": "text/csv",
-            ".md": "text/markdown",
-            ".jpg": "image/jpeg",
-            ".jpeg": "image/jpeg",
-            ".png": "image/png",
-            ".gif": "image/gif",
-            ".pdf": "application/pdf",
-            ".zip": "application/zip",
-            ".tar": "application/x-tar",
-            ".gz": "application/gzip",
-            ".exe": "application/x-msdownload",
-            ".dll": "application/x-msdownload",
-            ".so": "application/x-sharedlib",
-            ".a": "application/x-archive",
-            ".o": "application/x-object",
-            ".c": "text/x-c",
-            ".cpp": "text/x-c++",
-            ".h": "text/x-c",
-            ".java": "text/x-java-source",
-            ".class": "application/java-vm",
-            ".rb": "text/x-ruby",
-            ".php": "text/x-php",
-            ".sh": "text/x-shellscript",
-            ".bat": "text/x-msdos-batch",
-            ".ps1": "text/x-powershell",
-        }
-
-        # File type to MIME type mapping for special filesystem types
-        self.filesystem_mime_map = {
-            "directory": "inode/directory",
-            "symbolic link": "inode/symlink",
-            "block device": "inode/blockdevice",
-            "character device": "inode/chardevice",
-            "FIFO (named pipe)": "inode/fifo",
-            "socket": "inode/socket",
-            "executable file": "application/x-executable",
-            "executable script": "text/x-shellscript",
-        }
-
-        # Build reverse mapping for extension lookup
-        self.type_to_extensions = {}
-        for ext, file_type in self.extension_map.items():
-            if file_type not in self.type_to_extensions:
-                self.type_to_extensions[file_type] = []
-            self.type_to_extensions[file_type].append(ext)
+        # libmagic results keyed by file identity and modification state, so
+        # repeated or hard-linked files skip libmagic. Threads share it; each
+        # lookup, insert and eviction is a single atomic dict operation.
+        self._magic_cache = collections.OrderedDict()
+
+        # Extension and type tables are built once at module load
+        self.extension_map = _EXTENSION_MAP
+        self.extension_mime_map = _EXTENSION_MIME_MAP
+        self.filesystem_mime_map = _FILESYSTEM_MIME_MAP
+        self.type_to_extensions = _TYPE_TO_EXTENSIONS
+        self._type_to_extension_list = _TYPE_TO_EXTENSION_LIST
+
+        # Compiled language patterns, shared by all instances
+        (
+            self._language_patterns,
+            self._weak_language_patterns,
+            self._language_regex,
+            self._language_groups,
+            self._language_regex_re2,
+        ) = _compile_language_patterns()
+
+    @property
+    def mime_detector(self):
+        """
+        The first libmagic MIME type detector, shared by all testers and used
+        by magic tests whenever no other thread is using it
+        """
+        _reserve_magic_detectors(1)
+        return _magic_detector_pairs[0][0]
+
+    @property
+    def description_detector(self):
+        """
+        The first libmagic description detector, shared by all testers and used
+        by magic tests whenever no other thread is using it
+        """
+        _reserve_magic_detectors(1)
+        return _magic_detector_pairs[0][1]
 
     def debug_print(self, message):
-        """Print debug message to stderr if debug mode is enabled"""
+        """
+        Print debug message to stderr if debug mode is enabled
+
+        The detection methods check self.debug before calling this, so their
+        messages are not formatted at all when debug mode is off.
+        """
         if self.debug:
             print(f"DEBUG: {message}", file=sys.stderr)
 
     def get_extensions_for_type(self, file_type):
         """Get a slash-separated list of extensions for a given file type"""
-        if file_type in self.type_to_extensions:
-            # Sort extensions and remove the leading dot for display
-            extensions = sorted(self.type_to_extensions[file_type])
-            return "/".join(ext[1:] for ext in extensions)  # Remove leading dot
-        return ""
+        return self._type_to_extension_list.get(file_type, "")
 
-    def filesystem_tests(self, filepath):
+    def filesystem_tests(self, filepath, mode=None):
         """
         Filesystem-based tests: check extension, permissions, special files
+
+        mode may be the st_mode of os.lstat(filepath), or at least its file type
+        bits, to save looking it up again.
         """
-        self.debug_print(f"Running filesystem tests on '{filepath}'")
-        path = Path(filepath)
+        if self.debug:
+            self.debug_print(f"Running filesystem tests on '{filepath}'")
+        if mode is None:
+            try:
+                mode = os.lstat(filepath).st_mode
+            except (OSError, ValueError):
+                mode = 0
 
         # Check if it's a symbolic link first
-        if path.is_symlink():
-            self.debug_print(f"'{filepath}' is a symbolic link")
+        if stat.S_ISLNK(mode):
+            if self.debug:
+                self.debug_print(f"'{filepath}' is a symbolic link")
             if self.no_dereference:
                 # Don't follow symlinks - return "symbolic link" or MIME
-                self.debug_print(
-                    f"Not dereferencing symlink '{filepath}' "
-                    f"(no_dereference={self.no_dereference})"
-                )
+                if self.debug:
+                    self.debug_print(
+                        f"Not dereferencing symlink '{filepath}' "
+                        f"(no_dereference={self.no_dereference})"
+                    )
                 if self.mime:
                     return self.filesystem_mime_map["symbolic link"]
                 else:
                     return "symbolic link"
             else:
                 # Follow symlinks - continue with analysis of the target
-                self.debug_print(
-                    f"Dereferencing symlink '{filepath}' "
-                    f"(no_dereference={self.no_dereference})"
-                )
-                # Continue with normal analysis - the path methods will follow the link
-
-        # Check if it's a directory
-        if path.is_dir():
-            self.debug_print(f"'{filepath}' is a directory")
-            if self.mime:
-                return self.filesystem_mime_map["directory"]
-            else:
-                return "directory"
-
-        # Check if it's a block or character device
-        if path.is_block_device():
-            self.debug_print(f"'{filepath}' is a block device")
-            if self.mime:
-                return self.filesystem_mime_map["block device"]
-            else:
-                return "block device"
-        if path.is_char_device():
-            self.debug_print(f"'{filepath}' is a character device")
-            if self.mime:
-                return self.filesystem_mime_map["character device"]
-            else:
-                return "character device"
-
-        # Check if it's a FIFO or socket
-        if path.is_fifo():
-            self.debug_print(f"'{filepath}' is a FIFO")
-            if self.mime:
-                return self.filesystem_mime_map["FIFO (named pipe)"]
-            else:
-                return "FIFO (named pipe)"
-        if path.is_socket():
-            self.debug_print(f"'{filepath}' is a socket")
+                if self.debug:
+                    self.debug_print(
+                        f"Dereferencing symlink '{filepath}' "
+                        f"(no_dereference={self.no_dereference})"
+                    )
+                try:
+                    mode = os.stat(filepath).st_mode
+                except (OSError, ValueError):
+                    mode = 0
+
+        # Check if it's a directory, device, FIFO or socket
+        special_type = _SPECIAL_FILE_TYPES.get(stat.S_IFMT(mode))
+        if special_type is not None:
+            if self.debug:
+                self.debug_print(f"'{filepath}' is a {special_type}")
             if self.mime:
-                return self.filesystem_mime_map["socket"]
+                return self.filesystem_mime_map[special_type]
             else:
-                return "socket"
+                return special_type
 
         # Check executable permissions
-        if os.access(filepath, os.X_OK) and path.is_file():
-            self.debug_print(f"'{filepath}' has executable permissions")
-            # Check if it starts with shebang
+        if stat.S_ISREG(mode) and os.access(filepath, os.X_OK):
+            if self.debug:
+                self.debug_print(f"'{filepath}' has executable permissions")
+            # Check if it starts with shebang, allowing for a UTF-8 BOM. Nothing
+            # else reads an executable, so a single read on a bare descriptor
+            # is enough; a file object would add an fstat.
             try:
-                with open(filepath, "rb") as f:
-                    first_bytes = f.read(2)
-                    if first_bytes == b"#!":
+                fd = os.open(filepath, os.O_RDONLY)
+                try:
+                    first_bytes = os.read(fd, len(_UTF8_BOM) + 2)
+                finally:
+                    os.close(fd)
+                if first_bytes.startswith(_UTF8_BOM):
+                    first_bytes = first_bytes[len(_UTF8_BOM) :]
+                if first_bytes[:2] == b"#!":
+                    if self.debug:
                         self.debug_print(
                             f"'{filepath}' has shebang, detected as executable script"
                         )
-                        if self.mime:
-                            return self.filesystem_mime_map["executable script"]
-                        else:
-                            return "executable script"
+                    if self.mime:
+                        return self.filesystem_mime_map["executable script"]
+                    else:
+                        return "executable script"
             except (IOError, OSError) as e:
-                self.debug_print(f"Failed to read first bytes of '{filepath}': {e}")
+                if self.debug:
+                    self.debug_print(f"Failed to read first bytes of '{filepath}': {e}")
                 pass
-            self.debug_print(f"'{filepath}' is executable but no shebang detected")
+            if self.debug:
+                self.debug_print(f"'{filepath}' is executable but no shebang detected")
             if self.mime:
                 return self.filesystem_mime_map["executable file"]
             else:
                 return "executable file"
 
         # Check common extensions
-        extension = path.suffix.lower()
-        self.debug_print(f"'{filepath}' has extension: '{extension}'")
+        extension = _suffix(filepath).lower()
+        if self.debug:
+            self.debug_print(f"'{filepath}' has extension: '{extension}'")
 
         if self.mime:
             # Return MIME type for extension
-            if extension in self.extension_mime_map:
-                result = self.extension_mime_map[extension]
-                self.debug_print(f"Extension '{extension}' mapped to MIME: {result}")
+            result = self.extension_mime_map.get(extension)
+            if result is not None:
+                if self.debug:
+                    self.debug_print(
+                        f"Extension '{extension}' mapped to MIME: {result}"
+                    )
                 return result
         else:
             # Return human-readable type for extension
-            if extension in self.extension_map:
-                result = self.extension_map[extension]
-                self.debug_print(f"Extension '{extension}' mapped to: {result}")
+            result = self.extension_map.get(extension)
+            if result is not None:
+                if self.debug:
+                    self.debug_print(f"Extension '{extension}' mapped to: {result}")
                 return result
 
-        self.debug_print(f"Extension '{extension}' not found in mapping")
+        if self.debug:
+            self.debug_print(f"Extension '{extension}' not found in mapping")
         return None
 
-    def magic_tests(self, filepath):
+    def _magic_detect(self, filepath, fileobj, with_description=True, mode=None):
         """
-        Magic number tests using libmagic
+        Run the libmagic detectors on an open binary file
+
+        The description is None unless with_description is true, which saves a
+        pass over the magic database in MIME mode. mode is the st_mode of
+        os.lstat(filepath), looked up here when not given.
         """
-        self.debug_print(f"Running magic tests on '{filepath}'")
+        # Both detectors read the file through the same descriptor, instead of
+        # each detector opening it by name. libmagic describes a symlink given
+        # by path as the link itself ("symbolic link to ..."), and an empty
+        # file given by path as inode/x-empty, so those keep using the path.
+        # A symlink is cached under its own identity, not its target's.
+        fd = fileobj.fileno()
+        if mode is None:
+            mode = os.lstat(filepath).st_mode
+        if stat.S_ISLNK(mode):
+            st = os.lstat(filepath)
+            by_path = True
+        else:
+            st = os.fstat(fd)
+            by_path = st.st_size == 0
+        key = (st.st_dev, st.st_ino, st.st_mtime_ns, st.st_size)
+        cached = self._magic_cache.get(key)
+        if cached is not None and (cached[1] is not None or not with_description):
+            if self.debug:
+                self.debug_print(f"Using cached magic result for '{filepath}'")
+            return cached
+
+        def run(detector):
+            if by_path:
+                return detector.from_file(filepath)
+            # libmagic reads from the current offset
+            fileobj.seek(0)
+            return detector.from_descriptor(fd)
+
+        # libmagic is loaded the first time a file gets this far
+        try:
+            entry = _magic_detectors.get_nowait()
+        except queue.Empty:
+            entry = _new_magic_detectors()
         try:
-            # Get MIME type
-            mime_type = self.mime_detector.from_file(filepath)
-            self.debug_print(f"Magic MIME type for '{filepath}': {mime_type}")
+            _, (mime_detector, description_detector) = entry
+            if cached is not None:
+                mime_type = cached[0]
+            else:
+                mime_type = run(mime_detector)
+            description = run(description_detector) if with_description else None
+        finally:
+            _magic_detectors.put(entry)
+
+        if cached is None and len(self._magic_cache) >= _MAGIC_CACHE_SIZE:
+            self._magic_cache.popitem(last=False)
+        self._magic_cache[key] = (mime_type, description)
+        return mime_type, description
 
-            # Get file description
-            description = self.description_detector.from_file(filepath)
-            self.debug_print(f"Magic description for '{filepath}': {description}")
+    def magic_tests(self, filepath, fileobj=None, mode=None):
+        """
+        Magic number tests using libmagic
+
+        If fileobj is an open binary file for filepath, it is used instead of
+        opening the file again. mode may be the st_mode of os.lstat(filepath)
+        when the caller already has it.
+        """
+        if self.debug:
+            self.debug_print(f"Running magic tests on '{filepath}'")
+        try:
+            # The description is only needed for the readable format
+            with_description = not self.mime
+            if fileobj is None:
+                with open(filepath, "rb", buffering=0) as f:
+                    mime_type, description = self._magic_detect(
+                        filepath, f, with_description, mode
+                    )
+            else:
+                mime_type, description = self._magic_detect(
+                    filepath, fileobj, with_description, mode
+                )
+            if self.debug:
+                self.debug_print(f"Magic MIME type for '{filepath}': {mime_type}")
+                if with_description:
+                    self.debug_print(
+                        f"Magic description for '{filepath}': {description}"
+                    )
 
             # Return MIME type or readable format based on mode
             if self.mime:
                 # In MIME mode, return just the MIME type
                 if mime_type:
-                    self.debug_print(f"Magic MIME result for '{filepath}': {mime_type}")
+                    if self.debug:
+                        self.debug_print(
+                            f"Magic MIME result for '{filepath}': {mime_type}"
+                        )
                     return mime_type
             else:
                 # Return a more readable format
                 if mime_type and description:
                     result = f"{description} ({mime_type})"
-                    self.debug_print(f"Magic test result for '{filepath}': {result}")
+                    if self.debug:
+                        self.debug_print(
+                            f"Magic test result for '{filepath}': {result}"
+                        )
                     return result
                 elif mime_type:
                     result = f"file of type {mime_type}"
-                    self.debug_print(f"Magic test result for '{filepath}': {result}")
+                    if self.debug:
+                        self.debug_print(
+                            f"Magic test result for '{filepath}': {result}"
+                        )
                     return result
                 elif description:
-                    self.debug_print(
-                        f"Magic test result for '{filepath}': {description}"
-                    )
+                    if self.debug:
+                        self.debug_print(
+                            f"Magic test result for '{filepath}': {description}"
+                        )
                     return description
 
+        except ImportError:
+            # python-magic or libmagic is missing: fail the run, as when magic
+            # was imported at startup, rather than guessing for every file
+            raise
         except Exception as e:
-            self.debug_print(f"Magic test failed for '{filepath}': {e}")
+            if self.debug:
+                self.debug_print(f"Magic test failed for '{filepath}': {e}")
             # Fallback to Python's mimetypes module
+            import mimetypes
+
             mime_type, _ = mimetypes.guess_type(filepath)
             if mime_type is not None:
                 if self.mime:
-                    self.debug_print(
-                        f"Fallback MIME result for '{filepath}': {mime_type}"
-                    )
+                    if self.debug:
+                        self.debug_print(
+                            f"Fallback MIME result for '{filepath}': {mime_type}"
+                        )
                     return mime_type
                 else:
                     result = f"file of type {mime_type}"
-                    self.debug_print(
-                        f"Fallback mimetypes result for '{filepath}': {result}"
-                    )
+                    if self.debug:
+                        self.debug_print(
+                            f"Fallback mimetypes result for '{filepath}': {result}"
+                        )
                     return result
 
-        self.debug_print(f"Magic tests found no result for '{filepath}'")
+        if self.debug:
+            self.debug_print(f"Magic tests found no result for '{filepath}'")
         return None
 
-    def language_tests(self, filepath):
+    def language_tests(self, filepath, fileobj=None, mode=None):
         """
         Language detection tests based on file content analysis
+
+        If fileobj is an open binary file for filepath, it is used instead of
+        opening the file again. mode is accepted like in the other tests, and
+        not needed here.
         """
-        self.debug_print(f"Running language tests on '{filepath}'")
+        if self.debug:
+            self.debug_print(f"Running language tests on '{filepath}'")
         try:
-            # Try to read the file as text
-            with open(filepath, "r", encoding="utf-8", errors="ignore") as f:
-                content = f.read(1024)  # Read first 1KB
-
-            self.debug_print(f"Read {len(content)} characters from '{filepath}'")
-
-            # Check for specific language patterns
-            patterns = [
-                (
-                    r"#!/usr/bin/env python|#!/usr/bin/python|^import\s+\w+"
-                    r"|^from\s+\w+\s+import",
-                    "Python script",
-                    "text/x-python",
-                ),
-                (
-                    r"#!/bin/bash|#!/bin/sh|^#\s*bash|^#\s*shell",
-                    "shell script",
-                    "text/x-shellscript",
-                ),
-                (
-                    r"^#!/usr/bin/env node|^const\s+\w+|^let\s+\w+|^var\s+\w+",
-                    "JavaScript file",
-                    "text/javascript",
-                ),
-                (
-                    r'^#include\s*<.*>|^#include\s*".*"|int\s+main\s*\(',
-                    "C/C++ source",
-                    "text/x-c",
-                ),
-                (
-                    r"^package\s+\w+|^public\s+class\s+\w+|^import\s+java\.",
-                    "Java source",
-                    "text/x-java-source",
-                ),
-                (r"^<\?php|<\?=|\$\w+\s*=", "PHP script", "text/x-php"),
-                (
-                    r"^class\s+\w+|^def\s+\w+|^module\s+\w+",
-                    "Ruby script",
-                    "text/x-ruby",
-                ),
-                (
-                    r"^<!DOCTYPE html|^<html|^<head>|^<body>",
-                    "HTML document",
-                    "text/html",
-                ),
-                (r'^\s*{|\s*"[\w-]+"\s*:', "JSON data", "application/json"),
-                (r"^<\?xml|^<[a-zA-Z][^>]*>", "XML document", "application/xml"),
-                (
-                    r"^\s*[\w-]+\s*:\s*[\w-]+|^\s*\.|^\s*#[a-zA-Z]",
-                    "CSS stylesheet",
-                    "text/css",
-                ),
-                (
-                    r"^#+\s+\w+|^\*\s+\w+|^\d+\.\s+\w+",
-                    "Markdown document",
-                    "text/markdown",
-                ),
-            ]
-
-            for pattern, file_type, mime_type in patterns:
-                if re.search(pattern, content, re.MULTILINE | re.IGNORECASE):
-                    if self.mime:
+            # Read enough bytes for the first 1024 characters
+            if fileobj is None:
+                with open(filepath, "rb", buffering=0) as f:
+                    header = f.read(_HEADER_BYTES)
+            else:
+                fileobj.seek(0)
+                header = fileobj.read(_HEADER_BYTES)
+
+            # A NUL byte near the start marks binary data, as in file(1)
+            if b"\x00" in header[:512]:
+                if self.debug:
+                    self.debug_print(f"'{filepath}' has a NUL byte, skipping as binary")
+                return None
+
+            # Translate newlines the way text mode does, then keep the bytes of
+            # the first 1024 characters. Those are the first 1024 bytes when
+            # they are all ASCII; otherwise decode to find where they end.
+            content = header.replace(b"\r\n", b"\n").replace(b"\r", b"\n")
+            is_ascii = not _NON_ASCII.search(content, 0, _HEADER_CHARS)
+            if is_ascii:
+                content = content[:_HEADER_CHARS]
+            else:
+                content = content.decode("utf-8", errors="ignore")[:_HEADER_CHARS]
+                content = content.encode("utf-8")
+
+            if self.debug:
+                self.debug_print(f"Read {len(content)} bytes from '{filepath}'")
+
+            # Lowercase once rather than have the regex engine fold case at
+            # every position
+            lowered = content.lower()
+
+            # The combined pattern finds the leftmost match in one pass. Patterns
+            # earlier in the table still take precedence even if they match
+            # further into the content, so only those are checked one by one.
+            if self._language_regex_re2 is not None and is_ascii:
+                match = self._language_regex_re2.search(lowered)
+            else:
+                match = self._language_regex.search(lowered)
+            found = None
+            if match:
+                first = self._language_groups[match.lastindex]
+                for index, entry in enumerate(self._language_patterns[: first + 1]):
+                    regex, literals = entry[:2]
+                    if index < first:
+                        # Cheap substring prefilter before running the regex
+                        if literals and not any(lit in lowered for lit in literals):
+                            continue
+                        if not regex.search(lowered):
+                            continue
+                    found = entry
+                    break
+            else:
+                for entry in self._weak_language_patterns:
+                    regex, literals = entry[:2]
+                    if all(lit in lowered for lit in literals) and regex.search(
+                        lowered
+                    ):
+                        found = entry
+                        break
+
+            if found:
+                regex, _, file_type, mime_type = found
+                if self.mime:
+                    if self.debug:
                         self.debug_print(
-                            f"Pattern '{pattern}' matched for '{filepath}', "
-                            f"detected MIME: {mime_type}"
+                            f"Pattern '{regex.pattern.decode()}' matched for "
+                            f"'{filepath}', detected MIME: {mime_type}"
                         )
-                        return mime_type
-                    else:
+                    return mime_type
+                else:
+                    if self.debug:
                         self.debug_print(
-                            f"Pattern '{pattern}' matched for '{filepath}', "
-                            f"detected as: {file_type}"
+                            f"Pattern '{regex.pattern.decode()}' matched for "
+                            f"'{filepath}', detected as: {file_type}"
                         )
-                        return file_type
-
-            # Check if it's mostly text
-            printable_chars = sum(1 for c in content if c.isprintable() or c.isspace())
+                    return file_type
+
+            # Check if it's mostly text. Deleting the printable ASCII bytes in C
+            # leaves only the bytes still to judge; if none of those is
+            # non-ASCII, the count is done. Otherwise decode, and judge only the
+            # non-ASCII characters one by one. Decoding never drops ASCII
+            # bytes, so the ASCII count carries over.
+            remainder = content.translate(None, _PRINTABLE_ASCII)
+            printable_chars = len(content) - len(remainder)
+            if _NON_ASCII.search(remainder):
+                content = content.decode("utf-8", errors="ignore")
+                printable_chars += sum(
+                    1
+                    for c in "".join(_NON_ASCII_CHARS.findall(content))
+                    if c.isprintable() or c.isspace()
+                )
             if len(content) > 0:
                 printable_ratio = printable_chars / len(content)
-                self.debug_print(
-                    f"Printable character ratio for '{filepath}': "
-                    f"{printable_ratio:.2f}"
-                )
+                if self.debug:
+                    self.debug_print(
+                        f"Printable character ratio for '{filepath}': "
+                        f"{printable_ratio:.2f}"
+                    )
                 if printable_ratio > 0.7:
                     if self.mime:
-                        self.debug_print(
-                            f"'{filepath}' detected as text/plain based on "
-                            f"printable character ratio"
-                        )
+                        if self.debug:
+                            self.debug_print(
+                                f"'{filepath}' detected as text/plain based on "
+                                f"printable character ratio"
+                            )
                         return "text/plain"
                     else:
-                        self.debug_print(
-                            f"'{filepath}' detected as text file based on "
-                            f"printable character ratio"
-                        )
+                        if self.debug:
+                            self.debug_print(
+                                f"'{filepath}' detected as text file based on "
+                                f"printable character ratio"
+                            )
                         return "text file"
 
         except (UnicodeDecodeError, IOError, OSError) as e:
-            self.debug_print(f"Language test failed for '{filepath}': {e}")
+            if self.debug:
+                self.debug_print(f"Language test failed for '{filepath}': {e}")
             pass
 
-        self.debug_print(f"Language tests found no result for '{filepath}'")
+        if self.debug:
+            self.debug_print(f"Language tests found no result for '{filepath}'")
         return None
 
-    def detect_file_type(self, filepath, verbose=False):
+    def _open_for_content(self, filepath):
+        """Open a file for the content tests, or return None if it can't be"""
+        # Unbuffered: libmagic reads through the descriptor and the language
+        # tests read one small header, so a Python-side buffer only adds a copy
+        try:
+            return open(filepath, "rb", buffering=0)
+        except (IOError, OSError) as e:
+            # Each content test opens the file itself and reports the error
+            if self.debug:
+                self.debug_print(f"Failed to open '{filepath}' for content tests: {e}")
+            return None
+
+    def detect_file_type(self, filepath, verbose=False, mode=None):
         """
         Main detection method that runs tests in order
+
+        mode may be the st_mode of os.lstat(filepath), or at least its file type
+        bits, when the caller already has it.
         """
-        self.debug_print(f"Starting file type detection for '{filepath}'")
+        if self.debug:
+            self.debug_print(f"Starting file type detection for '{filepath}'")
 
-        # Check existence, but allow broken symlinks if no_dereference is True
-        path = Path(filepath)
-        if not os.path.exists(filepath) and not (
-            self.no_dereference and path.is_symlink()
+        # Check existence, but allow broken symlinks if no_dereference is True.
+        # The lstat mode is passed on to the tests.
+        if mode is None:
+            try:
+                mode = os.lstat(filepath).st_mode
+            except (OSError, ValueError):
+                pass
+        if mode is None or (
+            stat.S_ISLNK(mode)
+            and not self.no_dereference
+            and not os.path.exists(filepath)
         ):
             error_msg = f"ERROR: File '{filepath}' does not exist"
-            self.debug_print(error_msg)
+            if self.debug:
+                self.debug_print(error_msg)
             return error_msg, None
 
-        # Run tests in order
-        tests = [
-            ("Filesystem", self.filesystem_tests),
-            ("Magic", self.magic_tests),
-            ("Language", self.language_tests),
-        ]
-
-        for test_name, test_func in tests:
-            self.debug_print(f"Trying {test_name} test for '{filepath}'")
-            try:
-                result = test_func(filepath)
+        # Run tests in order. The first test with a result ends the run, so a
+        # file whose extension the filesystem test recognizes is never opened
+        # by libmagic or the language tests. Tests that read the file content
+        # share a single open file. Each test handles its own expected errors.
+        fileobj = None
+        opened = False
+        try:
+            for test_name, method_name, reads_content in _DETECTION_TESTS:
+                test_func = getattr(self, method_name)
+                if self.debug:
+                    self.debug_print(f"Trying {test_name} test for '{filepath}'")
+                if reads_content:
+                    if not opened:
+                        opened = True
+                        fileobj = self._open_for_content(filepath)
+                    result = test_func(filepath, fileobj=fileobj, mode=mode)
+                else:
+                    result = test_func(filepath, mode=mode)
                 if result:
-                    self.debug_print(
-                        f"{test_name} test succeeded for '{filepath}': {result}"
-                    )
+                    if self.debug:
+                        self.debug_print(
+                            f"{test_name} test succeeded for '{filepath}': {result}"
+                        )
                     if verbose:
                         return result, test_name
                     else:
                         return result, None
                 else:
-                    self.debug_print(
-                        f"{test_name} test returned no result for '{filepath}'"
-                    )
-            except Exception as e:
-                self.debug_print(f"{test_name} test failed for '{filepath}': {e}")
-                # Continue to next test if current one fails
-                continue
+                    if self.debug:
+                        self.debug_print(
+                            f"{test_name} test returned no result for '{filepath}'"
+                        )
+        finally:
+            if fileobj is not None:
+                fileobj.close()
 
-        self.debug_print(
-            f"All tests completed for '{filepath}', no definitive type found"
-        )
+        if self.debug:
+            self.debug_print(
+                f"All tests completed for '{filepath}', no definitive type found"
+            )
         unknown_type = "application/octet-stream" if self.mime else "unknown file type"
         if verbose:
             return unknown_type, "None"
@@ -467,9 +892,54 @@ class FileTypeTester:
             return unknown_type, None
 
 
+def _suffix(filepath):
+    """
+    Return the extension of the last path component, like Path(filepath).suffix
+    but without building a Path
+    """
+    name = os.path.basename(filepath.rstrip(os.sep))
+    index = name.rfind(".")
+    if 0 < index < len(name) - 1:
+        return name[index:]
+    return ""
+
+
+def _dirent_mode(entry):
+    """
+    Return the file type bits for an os.DirEntry, or None if it has gone
+
+    The type comes from the directory listing where the platform provides it,
+    so regular files, directories and symlinks need no stat call.
+    """
+    try:
+        if entry.is_symlink():
+            return stat.S_IFLNK
+        if entry.is_dir(follow_symlinks=False):
+            return stat.S_IFDIR
+        if entry.is_file(follow_symlinks=False):
+            return stat.S_IFREG
+        return entry.stat(follow_symlinks=False).st_mode
+    except OSError:
+        return None
+
+
+def _detect_in_order(executor, detect, items, window):
+    """
+    Yield detect(item) for each item in order, running up to window calls
+    ahead on executor
+    """
+    pending = collections.deque()
+    for item in items:
+        pending.append(executor.submit(detect, item))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
 def read_files_from_namefile(namefile, debug=False, exit_on_error=False):
-    """Read filenames from a namefile, one per line"""
-    files = []
+    """Yield filenames from a namefile, one per line, as they are read"""
+    count = 0
     if debug:
         print(f"DEBUG: Reading filenames from '{namefile}'", file=sys.stderr)
 
@@ -481,21 +951,23 @@ def read_files_from_namefile(namefile, debug=False, exit_on_error=False):
             for line in sys.stdin:
                 filename = line.strip()
                 if filename:  # Skip empty lines
-                    files.append(filename)
+                    count += 1
                     if debug:
                         print(f"DEBUG: Added '{filename}' from stdin", file=sys.stderr)
+                    yield filename
         else:
             # Read from file
             with open(namefile, "r", encoding="utf-8") as f:
                 for line_num, line in enumerate(f, 1):
                     filename = line.strip()
                     if filename:  # Skip empty lines
-                        files.append(filename)
+                        count += 1
                         if debug:
                             print(
                                 f"DEBUG: Added '{filename}' from {namefile}:{line_num}",
                                 file=sys.stderr,
                             )
+                        yield filename
                     elif debug:
                         print(
                             f"DEBUG: Skipped empty line {line_num} in '{namefile}'",
@@ -510,11 +982,10 @@ def read_files_from_namefile(namefile, debug=False, exit_on_error=False):
             print(error_msg)
             if debug:
                 print(f"DEBUG: {error_msg}", file=sys.stderr)
-            return []
+            return
 
     if debug:
-        print(f"DEBUG: Read {len(files)} filenames from '{namefile}'", file=sys.stderr)
-    return files
+        print(f"DEBUG: Read {count} filenames from '{namefile}'", file=sys.stderr)
 
 
 def main():
@@ -536,29 +1007,87 @@ def main():
     remaining_files = []
     any_files_processed = False
 
-    # Initialize the tester early so it can be used in file processing
-    tester = FileTypeTester(debug=debug, no_dereference=no_dereference, mime=mime)
+    # The tester is built when files are first processed, so that --help,
+    # --version and usage errors do not load libmagic
+    tester = None
+
+    def update_tester():
+        """Create the tester, or apply the current settings to it"""
+        nonlocal tester
+        if tester is None:
+            tester = FileTypeTester(
+                debug=debug, no_dereference=no_dereference, mime=mime
+            )
+        else:
+            tester.debug = debug
+            tester.mime = mime
+            if no_dereference is not None:
+                tester.no_dereference = no_dereference
+
+    # Result lines are written to stdout in batches instead of one print per
+    # file. With debug output they are written at once, to stay in step with
+    # the messages on stderr.
+    output_lines = []
+
+    def output(line):
+        """Queue a line for stdout"""
+        output_lines.append(line)
+        if debug or len(output_lines) >= _OUTPUT_BATCH_SIZE:
+            flush_output()
+
+    def flush_output():
+        """Write all queued lines to stdout"""
+        if output_lines:
+            sys.stdout.write("\n".join(output_lines) + "\n")
+            del output_lines[:]
 
     def process_files_with_current_settings(files_to_process):
         """Process files immediately with current settings"""
         nonlocal any_files_processed
-
+        update_tester()
+
+        # Classify every path first, so that the plain files are detected as
+        # one list (on the thread pool when it is long enough) rather than one
+        # call at a time. detect_file_types is lazy: a file is only detected
+        # when its result is taken below, after the directories listed before
+        # it have been walked and printed.
+        kinds = []
+        files = []
         for filepath in files_to_process:
+            # Check if the path exists at all (but handle symlinks specially)
+            try:
+                lstat_mode = os.lstat(filepath).st_mode
+            except (OSError, ValueError):
+                kinds.append((filepath, "missing"))
+                continue
+            mode = lstat_mode
+            if stat.S_ISLNK(mode) and not tester.no_dereference:
+                try:
+                    mode = os.stat(filepath).st_mode
+                except (OSError, ValueError):
+                    pass
+            # Check if it's a directory, but handle symlinks specially
+            if stat.S_ISDIR(mode):
+                kinds.append((filepath, "directory"))
+            else:
+                kinds.append((filepath, "file"))
+                files.append((filepath, lstat_mode))
+        results = detect_file_types(files)
+
+        for filepath, kind in kinds:
             any_files_processed = True
-            path = Path(filepath)
 
-            # Check if the path exists at all (but handle symlinks specially)
-            if not path.exists() and not path.is_symlink():
+            if kind == "missing":
                 error_msg = f"ERROR: File or directory '{filepath}' does not exist"
                 if exit_on_error:
+                    flush_output()
                     print(error_msg, file=sys.stderr)
                     sys.exit(1)
                 else:
-                    print(f"{filepath}{separator} {error_msg}")
+                    output(f"{filepath}{separator} {error_msg}")
                     continue
 
-            # Check if it's a directory, but handle symlinks specially
-            if path.is_dir() and not (path.is_symlink() and tester.no_dereference):
+            if kind == "directory":
                 if debug:
                     print(
                         f"DEBUG: '{filepath}' is a directory, processing recursively",
@@ -573,15 +1102,18 @@ def main():
                             f"'{filepath}', sorting...",
                             file=sys.stderr,
                         )
-                    for file_in_dir in sorted(files_in_dir):
-                        process_single_file(file_in_dir)
+                    files_in_dir.sort()
+                    for (file_in_dir, _), result in zip(
+                        files_in_dir, detect_file_types(files_in_dir)
+                    ):
+                        process_single_file(file_in_dir, result)
                 else:
                     if debug:
                         print(
                             f"DEBUG: Directory '{filepath}' is empty or inaccessible",
                             file=sys.stderr,
                         )
-                    print(f"{filepath}{separator} directory (empty or inaccessible)")
+                    output(f"{filepath}{separator} directory (empty or inaccessible)")
             else:
                 if debug:
                     print(
@@ -589,14 +1121,50 @@ def main():
                         file=sys.stderr,
                     )
                 # Process single file
-                process_single_file(filepath)
+                process_single_file(filepath, next(results))
+
+    def process_namefile_batch(filenames, namefile):
+        """Process a batch of names read from namefile"""
+        if debug:
+            print(
+                f"DEBUG: Processing {len(filenames)} files "
+                f"from '{namefile}' with separator '{separator}'",
+                file=sys.stderr,
+            )
+        process_files_with_current_settings(filenames)
+        flush_output()
+
+    def detect_file_types(files):
+        """
+        Detect the types of (filepath, lstat mode) pairs, yielding results in
+        order
+        """
+        workers = os.cpu_count() or 1
+        if debug or workers < 2 or len(files) <= _PARALLEL_MIN_FILES:
+            # Debug output from concurrent detections would interleave
+            for filepath, mode in files:
+                yield tester.detect_file_type(filepath, verbose=verbose, mode=mode)
+            return
+
+        # The workers share the tester and its libmagic cache. Each worker that
+        # reaches the magic tests gets its own pair of libmagic detectors.
+        def detect(item):
+            filepath, mode = item
+            return tester.detect_file_type(filepath, verbose=verbose, mode=mode)
+
+        from concurrent.futures import ThreadPoolExecutor
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for result in _detect_in_order(executor, detect, files, window=workers * 4):
+                yield result
 
-    def process_single_file(filepath):
-        """Process a single file and output the result"""
-        file_type, test_category = tester.detect_file_type(filepath, verbose=verbose)
+    def process_single_file(filepath, result):
+        """Output the detection result for a single file"""
+        file_type, test_category = result
 
         # Check for errors and exit if -E flag is enabled
         if exit_on_error and file_type.startswith("ERROR:"):
+            flush_output()
             print(file_type, file=sys.stderr)
             sys.exit(1)
 
@@ -605,242 +1173,266 @@ def main():
             extensions = tester.get_extensions_for_type(file_type)
             if extensions:
                 if brief:
-                    print(extensions)
+                    output(extensions)
                 else:
-                    print(f"{filepath}{separator} {extensions}")
+                    output(f"{filepath}{separator} {extensions}")
             else:
                 if brief:
-                    print("")
+                    output("")
                 else:
-                    print(f"{filepath}{separator} ")
+                    output(f"{filepath}{separator} ")
         elif brief:
             # Brief mode: only output the file type
-            print(file_type)
+            output(file_type)
         elif verbose and test_category:
             # Verbose mode: include test category
-            print(f"{filepath}{separator} {file_type} [{test_category} test]")
+            output(f"{filepath}{separator} {file_type} [{test_category} test]")
         else:
             # Default mode: filename and file type
-            print(f"{filepath}{separator} {file_type}")
+            output(f"{filepath}{separator} {file_type}")
 
     def get_files_from_directory(directory_path):
-        """Recursively get all files from a directory"""
+        """
+        Recursively get all files from a directory, as (filepath, lstat mode)
+        pairs
+
+        Like os.walk, this skips directories that cannot be read and does not
+        descend into symlinks to directories.
+        """
         if debug:
             print(
                 f"DEBUG: Scanning directory '{directory_path}' for files",
                 file=sys.stderr,
             )
         files = []
-        try:
-            for root, dirs, filenames in os.walk(directory_path):
+        directories = [directory_path]
+        while directories:
+            root = directories.pop()
+            try:
+                with os.scandir(root) as it:
+                    entries = list(it)
+            except OSError:
+                continue
+            subdirectories = []
+            filenames = []
+            for entry in entries:
+                mode = _dirent_mode(entry)
+                if mode is not None and stat.S_ISDIR(mode):
+                    subdirectories.append(entry.path)
+                elif mode is not None and stat.S_ISLNK(mode):
+                    # os.walk lists symlinks to directories with the
+                    # directories, and does not follow them. Like os.walk, a
+                    # link that cannot be followed (a loop, or a target that
+                    # cannot be read) counts as a file.
+                    try:
+                        links_to_directory = entry.is_dir()
+                    except OSError:
+                        links_to_directory = False
+                    if not links_to_directory:
+                        filenames.append((entry.path, mode))
+                else:
+                    filenames.append((entry.path, mode))
+            # Visit subdirectories top-down in listing order, as os.walk does
+            directories.extend(reversed(subdirectories))
+            if debug:
+                print(
+                    f"DEBUG: Found {len(filenames)} files in '{root}'",
+                    file=sys.stderr,
+                )
+            for full_path, mode in filenames:
+                files.append((full_path, mode))
                 if debug:
                     print(
-                        f"DEBUG: Found {len(filenames)} files in '{root}'",
+                        f"DEBUG: Added file '{full_path}' to processing list",
                         file=sys.stderr,
                     )
-                for filename in filenames:
-                    full_path = os.path.join(root, filename)
-                    files.append(full_path)
-                    if debug:
-                        print(
-                            f"DEBUG: Added file '{full_path}' to processing list",
-                            file=sys.stderr,
-                        )
-        except (OSError, PermissionError) as e:
-            error_msg = f"ERROR: Cannot access directory '{directory_path}': {e}"
-            if exit_on_error:
-                print(error_msg, file=sys.stderr)
-                sys.exit(1)
-            else:
-                print(error_msg)
-                if debug:
-                    print(f"DEBUG: {error_msg}", file=sys.stderr)
         return files
 
-    i = 0
-    while i < len(argv):
-        arg = argv[i]
-
-        if arg == "--help":
-            # Show help and exit
-            parser = argparse.ArgumentParser(
-                description=(
-                    "FFT - File Type Tester: Determine file types using filesystem, "
-                    "magic, and language tests"
-                ),
-                add_help=False,  # Disable automatic help to use -h for no-dereference
-            )
-            parser.add_argument(
-                "files", nargs="*", help="Files or directories to analyze"
-            )
-            parser.add_argument(
-                "-v",
-                "--verbose",
-                action="store_true",
-                help="Show which test category detected the file type",
-            )
-            parser.add_argument(
-                "-b",
-                "--brief",
-                action="store_true",
-                help="Do not prepend filenames to output lines (brief mode)",
-            )
-            parser.add_argument(
-                "-r",
-                "--recursive",
-                action="store_true",
-                help=(
-                    "Recursively process directories "
-                    "(default when directory is given)"
-                ),
-            )
-            parser.add_argument(
-                "-d",
-                "--debug",
-                action="store_true",
-                help="Print internal debugging information to stderr",
-            )
-            parser.add_argument(
-                "-E",
-                "--exit-on-error",
-                action="store_true",
-                help="Exit immediately on filesystem errors instead of continuing",
-            )
-            parser.add_argument(
-                "--extension",
-                action="store_true",
-                help=(
-                    "Print a slash-separated list of valid extensions "
-                    "for the file type found"
-                ),
-            )
-            parser.add_argument(
-                "-F",
-                "--separator",
-                default=":",
-                help=(
-                    "Use the specified string as the separator between "
-                    "the filename and the file result (default: ':')"
-                ),
-            )
-            parser.add_argument(
-                "-f",
-                "--files-from",
-                metavar="namefile",
-                help=(
-                    "Read the names of the files to be examined from namefile "
-                    "(one per line) before the argument list"
-                ),
-            )
-            parser.add_argument(
-                "-h",
-                "--no-dereference",
-                action="store_true",
-                help=(
-                    "This option causes symlinks not to be followed "
-                    "(on systems that support symbolic links). "
-                    "This is the default if the environment variable "
-                    "POSIXLY_CORRECT is not defined."
-                ),
-            )
-            parser.add_argument(
-                "-i",
-                "--mime",
-                action="store_true",
-                help=(
-                    "Causes the file command to output mime type strings "
-                    "rather than the more traditional human readable ones. "
-                    "Thus it may say 'text/plain; charset=us-ascii' rather "
-                    "than 'ASCII text'."
-                ),
-            )
-            parser.add_argument(
-                "--version",
-                action="version",
-                version=f"%(prog)s {__version__}",
-                help="Show version information",
-            )
-            parser.add_argument(
-                "--help",
-                action="help",
-                help="Show this help message and exit",
-            )
-            parser.print_help()
-            sys.exit(0)
-        elif arg == "--version":
-            print(f"fft {__version__}")
-            sys.exit(0)
-        elif arg in ["-v", "--verbose"]:
-            verbose = True
-        elif arg in ["-b", "--brief"]:
-            brief = True
-        elif arg in ["-r", "--recursive"]:
-            pass  # Recursive is default behavior for directories
-        elif arg in ["-d", "--debug"]:
-            debug = True
-            # Update tester debug setting
-            tester = FileTypeTester(
-                debug=debug, no_dereference=no_dereference, mime=mime
-            )
-        elif arg in ["-E", "--exit-on-error"]:
-            exit_on_error = True
-        elif arg in ["-h", "--no-dereference"]:
-            no_dereference = True
-            # Update tester no_dereference setting
-            tester = FileTypeTester(
-                debug=debug, no_dereference=no_dereference, mime=mime
-            )
-        elif arg in ["-i", "--mime"]:
-            mime = True
-            # Update tester mime setting
-            tester = FileTypeTester(
-                debug=debug, no_dereference=no_dereference, mime=mime
-            )
-        elif arg == "--extension":
-            extension = True
-        elif arg in ["-F", "--separator"]:
-            if i + 1 >= len(argv):
-                print(f"Error: {arg} requires an argument", file=sys.stderr)
-                sys.exit(2)
-            separator = argv[i + 1]
-            i += 1  # Skip the separator value
-        elif arg in ["-f", "--files-from"]:
-            if i + 1 >= len(argv):
-                print(f"Error: {arg} requires an argument", file=sys.stderr)
+    try:
+        i = 0
+        while i < len(argv):
+            arg = argv[i]
+
+            if arg == "--help":
+                # Show help and exit
+                import argparse
+
+                parser = argparse.ArgumentParser(
+                    description=(
+                        "FFT - File Type Tester: Determine file types using "
+                        "filesystem, magic, and language tests"
+                    ),
+                    # Disable automatic help to use -h for no-dereference
+                    add_help=False,
+                )
+                parser.add_argument(
+                    "files", nargs="*", help="Files or directories to analyze"
+                )
+                parser.add_argument(
+                    "-v",
+                    "--verbose",
+                    action="store_true",
+                    help="Show which test category detected the file type",
+                )
+                parser.add_argument(
+                    "-b",
+                    "--brief",
+                    action="store_true",
+                    help="Do not prepend filenames to output lines (brief mode)",
+                )
+                parser.add_argument(
+                    "-r",
+                    "--recursive",
+                    action="store_true",
+                    help=(
+                        "Recursively process directories "
+                        "(default when directory is given)"
+                    ),
+                )
+                parser.add_argument(
+                    "-d",
+                    "--debug",
+                    action="store_true",
+                    help="Print internal debugging information to stderr",
+                )
+                parser.add_argument(
+                    "-E",
+                    "--exit-on-error",
+                    action="store_true",
+                    help="Exit immediately on filesystem errors instead of continuing",
+                )
+                parser.add_argument(
+                    "--extension",
+                    action="store_true",
+                    help=(
+                        "Print a slash-separated list of valid extensions "
+                        "for the file type found"
+                    ),
+                )
+                parser.add_argument(
+                    "-F",
+                    "--separator",
+                    default=":",
+                    help=(
+                        "Use the specified string as the separator between "
+                        "the filename and the file result (default: ':')"
+                    ),
+                )
+                parser.add_argument(
+                    "-f",
+                    "--files-from",
+                    metavar="namefile",
+                    help=(
+                        "Read the names of the files to be examined from namefile "
+                        "(one per line) before the argument list"
+                    ),
+                )
+                parser.add_argument(
+                    "-h",
+                    "--no-dereference",
+                    action="store_true",
+                    help=(
+                        "This option causes symlinks not to be followed "
+                        "(on systems that support symbolic links). "
+                        "This is the default if the environment variable "
+                        "POSIXLY_CORRECT is not defined."
+                    ),
+                )
+                parser.add_argument(
+                    "-i",
+                    "--mime",
+                    action="store_true",
+                    help=(
+                        "Causes the file command to output mime type strings "
+                        "rather than the more traditional human readable ones. "
+                        "Thus it may say 'text/plain; charset=us-ascii' rather "
+                        "than 'ASCII text'."
+                    ),
+                )
+                parser.add_argument(
+                    "--version",
+                    action="version",
+                    version=f"%(prog)s {__version__}",
+                    help="Show version information",
+                )
+                parser.add_argument(
+                    "--help",
+                    action="help",
+                    help="Show this help message and exit",
+                )
+                flush_output()
+                parser.print_help()
+                sys.exit(0)
+            elif arg == "--version":
+                flush_output()
+                print(f"fft {__version__}")
+                sys.exit(0)
+            elif arg in ["-v", "--verbose"]:
+                verbose = True
+            elif arg in ["-b", "--brief"]:
+                brief = True
+            elif arg in ["-r", "--recursive"]:
+                pass  # Recursive is default behavior for directories
+            elif arg in ["-d", "--debug"]:
+                debug = True
+            elif arg in ["-E", "--exit-on-error"]:
+                exit_on_error = True
+            elif arg in ["-h", "--no-dereference"]:
+                no_dereference = True
+            elif arg in ["-i", "--mime"]:
+                mime = True
+            elif arg == "--extension":
+                extension = True
+            elif arg in ["-F", "--separator"]:
+                if i + 1 >= len(argv):
+                    print(f"Error: {arg} requires an argument", file=sys.stderr)
+                    sys.exit(2)
+                separator = argv[i + 1]
+                i += 1  # Skip the separator value
+            elif arg in ["-f", "--files-from"]:
+                if i + 1 >= len(argv):
+                    print(f"Error: {arg} requires an argument", file=sys.stderr)
+                    sys.exit(2)
+                namefile = argv[i + 1]
+                i += 1  # Skip the namefile value
+
+                # Process files-from immediately with current settings, a
+                # batch at a time as the names are read. The namefile reader
+                # writes errors to stdout itself, so output is flushed before
+                # reading more.
+                flush_output()
+                batch = []
+                for filename in read_files_from_namefile(
+                    namefile, debug, exit_on_error
+                ):
+                    batch.append(filename)
+                    if len(batch) >= _NAMEFILE_BATCH_SIZE:
+                        process_namefile_batch(batch, namefile)
+                        batch = []
+                if batch:
+                    process_namefile_batch(batch, namefile)
+            elif arg.startswith("-"):
+                print(f"Error: Unknown option {arg}", file=sys.stderr)
                 sys.exit(2)
-            namefile = argv[i + 1]
-            i += 1  # Skip the namefile value
+            else:
+                # Regular file argument - save for later processing
+                remaining_files.append(arg)
 
-            # Process files-from immediately with current settings
-            files_from_namefile = read_files_from_namefile(
-                namefile, debug, exit_on_error
-            )
+            i += 1
+
+        # Process any remaining command line file arguments
+        if remaining_files:
             if debug:
                 print(
-                    f"DEBUG: Processing {len(files_from_namefile)} files "
-                    f"from '{namefile}' with separator '{separator}'",
+                    f"DEBUG: Processing {len(remaining_files)} remaining command line "
+                    f"files with separator '{separator}'",
                     file=sys.stderr,
                 )
-            process_files_with_current_settings(files_from_namefile)
-        elif arg.startswith("-"):
-            print(f"Error: Unknown option {arg}", file=sys.stderr)
-            sys.exit(2)
-        else:
-            # Regular file argument - save for later processing
-            remaining_files.append(arg)
-
-        i += 1
+            process_files_with_current_settings(remaining_files)
+            any_files_processed = True
 
-    # Process any remaining command line file arguments
-    if remaining_files:
-        if debug:
-            print(
-                f"DEBUG: Processing {len(remaining_files)} remaining command line "
-                f"files with separator '{separator}'",
-                file=sys.stderr,
-            )
-        process_files_with_current_settings(remaining_files)
-        any_files_processed = True
+    finally:
+        flush_output()
 
     # Validate that we processed at least one file
     if not any_files_processed:
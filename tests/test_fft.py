@@ -3,7 +3,9 @@
 
 """Tests for FFT (File Type Tester)."""
 
+import concurrent.futures
 import os
+import queue
 import sys
 import tempfile
 import unittest.mock
@@ -55,6 +57,20 @@ class TestFileTypeTester:
             result = self.tester.filesystem_tests(link_file)
             assert result == "symbolic link"
 
+    def test_suffix_matches_pathlib(self):
+        """Test that the extension helper agrees with Path.suffix."""
+        for filepath in [
+            "file.py",
+            "archive.tar.GZ",
+            "dir.d/file",
+            ".bashrc",
+            "trailing.",
+            "file.py/",
+            "a..b",
+            "..",
+        ]:
+            assert fft._suffix(filepath) == Path(filepath).suffix, filepath
+
     def test_filesystem_tests_executable_script(self):
         """Test filesystem tests with executable script."""
         with tempfile.NamedTemporaryFile(mode="w", delete=False, suffix=".py") as f:
@@ -69,6 +85,19 @@ class TestFileTypeTester:
 
             os.unlink(f.name)
 
+    def test_filesystem_tests_executable_script_with_bom(self):
+        """Test that a UTF-8 byte order mark does not hide the shebang."""
+        with tempfile.NamedTemporaryFile(mode="wb", delete=False) as f:
+            f.write(b"\xef\xbb\xbf#!/bin/sh\necho hello\n")
+            f.flush()
+
+            os.chmod(f.name, 0o755)
+
+            result = self.tester.filesystem_tests(f.name)
+            assert result == "executable script"
+
+            os.unlink(f.name)
+
     def test_filesystem_tests_executable_file(self):
         """Test filesystem tests with executable file (no shebang)."""
         with tempfile.NamedTemporaryFile(mode="w", delete=False) as f:
@@ -97,6 +126,9 @@ class TestFileTypeTester:
             ("file.png", "PNG image"),
             ("file.pdf", "PDF document"),
             ("file.zip", "ZIP archive"),
+            ("file.hpp", "C++ header file"),
+            ("file.go", "Go source file"),
+            ("file.rs", "Rust source file"),
             ("file.unknown", None),
         ]
 
@@ -120,11 +152,11 @@ class TestFileTypeTester:
 
             # Mock the magic detectors
             with unittest.mock.patch.object(
-                self.tester.mime_detector, "from_file", return_value="text/plain"
+                self.tester.mime_detector, "from_descriptor", return_value="text/plain"
             ):
                 with unittest.mock.patch.object(
                     self.tester.description_detector,
-                    "from_file",
+                    "from_descriptor",
                     return_value="ASCII text",
                 ):
                     result = self.tester.magic_tests(f.name)
@@ -134,19 +166,183 @@ class TestFileTypeTester:
 
     def test_magic_tests_exception_handling(self):
         """Test magic tests exception handling."""
-        with unittest.mock.patch.object(
-            self.tester.mime_detector, "from_file", side_effect=Exception("Mock error")
-        ):
+        with tempfile.NamedTemporaryFile(mode="w", delete=False) as f:
+            f.write("test content")
+
+        try:
             with unittest.mock.patch.object(
-                self.tester.description_detector,
-                "from_file",
+                self.tester.mime_detector,
+                "from_descriptor",
                 side_effect=Exception("Mock error"),
-            ):
-                with unittest.mock.patch(
-                    "mimetypes.guess_type", return_value=("text/plain", None)
+            ) as mime_from_descriptor:
+                with unittest.mock.patch.object(
+                    self.tester.description_detector,
+                    "from_descriptor",
+                    side_effect=Exception("Mock error"),
+                ):
+                    with unittest.mock.patch(
+                        "mimetypes.guess_type", return_value=("text/plain", None)
+                    ):
+                        result = self.tester.magic_tests(f.name)
+                        assert result == "file of type text/plain"
+                        mime_from_descriptor.assert_called_once()
+        finally:
+            os.unlink(f.name)
+
+    def test_magic_tests_cached_by_file_identity(self):
+        """Test that libmagic runs once for an unchanged file."""
+        with tempfile.NamedTemporaryFile(mode="w", delete=False) as f:
+            f.write("test content")
+            f.flush()
+
+            with unittest.mock.patch.object(
+                self.tester.mime_detector,
+                "from_descriptor",
+                wraps=self.tester.mime_detector.from_descriptor,
+            ) as from_descriptor:
+                first = self.tester.magic_tests(f.name)
+                second = self.tester.magic_tests(f.name)
+                assert first == second
+                assert from_descriptor.call_count == 1
+
+                # A modified file is detected again
+                with open(f.name, "a") as g:
+                    g.write(" more")
+                self.tester.magic_tests(f.name)
+                assert from_descriptor.call_count == 2
+
+            os.unlink(f.name)
+
+    def test_magic_tests_mime_mode_skips_description(self):
+        """Test that MIME mode does not ask libmagic for a description."""
+        tester = fft.FileTypeTester(mime=True)
+        with tempfile.NamedTemporaryFile(mode="w", delete=False) as f:
+            f.write("test content")
+            f.flush()
+
+            with unittest.mock.patch.object(
+                tester.description_detector,
+                "from_descriptor",
+                wraps=tester.description_detector.from_descriptor,
+            ) as from_descriptor:
+                assert tester.magic_tests(f.name) == "text/plain"
+                assert from_descriptor.call_count == 0
+
+                # The cached entry gets its description when it is needed
+                tester.mime = False
+                assert tester.magic_tests(f.name).endswith("(text/plain)")
+                assert from_descriptor.call_count == 1
+
+            os.unlink(f.name)
+
+    def test_magic_tests_missing_libmagic(self):
+        """Test that a missing python-magic is not hidden by the fallback."""
+        with tempfile.NamedTemporaryFile(mode="w", delete=False) as f:
+            f.write("test content")
+
+        try:
+            with unittest.mock.patch.object(
+                fft, "_magic_detectors", queue.PriorityQueue()
+            ), unittest.mock.patch.object(
+                fft, "_new_magic_detectors", side_effect=ImportError("magic")
+            ), unittest.mock.patch(
+                "mimetypes.guess_type"
+            ) as guess:
+                with pytest.raises(ImportError):
+                    self.tester.magic_tests(f.name)
+                guess.assert_not_called()
+        finally:
+            os.unlink(f.name)
+
+    def test_magic_tests_symlink_described_as_link(self):
+        """Test that libmagic describes a dereferenced symlink as the link."""
+        tester = fft.FileTypeTester(no_dereference=False, mime=True)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            for name, content in (("full", "test content"), ("empty", "")):
+                target = os.path.join(tmpdir, name)
+                with open(target, "w") as f:
+                    f.write(content)
+                link = os.path.join(tmpdir, f"{name}-link")
+                os.symlink(target, link)
+
+                # The same for empty and non-empty targets, and not taken
+                # from the cache entry of the target
+                assert tester.magic_tests(target) != "inode/symlink"
+                assert tester.magic_tests(link) == "inode/symlink"
+
+    def test_testers_share_magic_detectors(self):
+        """Test that libmagic detectors are loaded once and shared."""
+        other = fft.FileTypeTester(debug=True, mime=True)
+        assert other.mime_detector is self.tester.mime_detector
+        assert other.description_detector is self.tester.description_detector
+
+    def test_magic_tests_with_detector_pool(self):
+        """Test that magic tests run concurrently on a pool of detectors."""
+        from concurrent.futures import ThreadPoolExecutor
+
+        # A pool of its own, so that other tests keep using the shared one
+        with unittest.mock.patch.object(
+            fft, "_magic_detector_pairs", []
+        ), unittest.mock.patch.object(fft, "_magic_detectors", queue.PriorityQueue()):
+            fft._reserve_magic_detectors(3)
+            assert len(fft._magic_detector_pairs) == 3
+            assert fft._magic_detectors.qsize() == 3
+
+            with tempfile.TemporaryDirectory() as tmpdir:
+                paths = []
+                for index in range(12):
+                    path = os.path.join(tmpdir, f"file{index}")
+                    with open(path, "wb") as f:
+                        f.write(
+                            b"plain text\n" if index % 2 else b"\x7fELF\x02\x01\x01"
+                        )
+                    paths.append(path)
+
+                with ThreadPoolExecutor(max_workers=3) as executor:
+                    results = list(executor.map(self.tester.magic_tests, paths))
+
+                assert results == [self.tester.magic_tests(path) for path in paths]
+                assert fft._magic_detectors.qsize() == len(fft._magic_detector_pairs)
+
+    def test_reserve_magic_detectors_concurrently(self):
+        """Test that concurrent reservations do not create extra detectors."""
+        from concurrent.futures import ThreadPoolExecutor
+
+        with unittest.mock.patch.object(
+            fft, "_magic_detector_pairs", []
+        ), unittest.mock.patch.object(fft, "_magic_detectors", queue.PriorityQueue()):
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                list(executor.map(fft._reserve_magic_detectors, [2] * 4))
+
+            assert len(fft._magic_detector_pairs) == 2
+            assert fft._magic_detectors.qsize() == 2
+
+    def test_libmagic_loaded_only_when_needed(self):
+        """Test that files recognized by extension never load libmagic."""
+        with tempfile.NamedTemporaryFile(mode="w", suffix=".py", delete=False) as f:
+            f.write("print('hello')")
+            f.flush()
+
+            with unittest.mock.patch("fft._new_magic_detectors") as new_detectors:
+                with unittest.mock.patch.object(
+                    fft, "_magic_detectors", queue.PriorityQueue()
                 ):
-                    result = self.tester.magic_tests("dummy_file")
-                    assert result == "file of type text/plain"
+                    tester = fft.FileTypeTester()
+                    result, _ = tester.detect_file_type(f.name)
+
+            assert result == "Python script"
+            new_detectors.assert_not_called()
+
+            os.unlink(f.name)
+
+    def test_magic_tests_empty_file(self):
+        """Test that empty files keep libmagic's path-based result."""
+        tester = fft.FileTypeTester(mime=True)
+        with tempfile.NamedTemporaryFile(delete=False) as f:
+            result = tester.magic_tests(f.name)
+            assert result == tester.mime_detector.from_file(f.name)
+
+            os.unlink(f.name)
 
     def test_language_tests_python(self):
         """Test language detection for Python files."""
@@ -203,6 +399,70 @@ class TestFileTypeTester:
 
             os.unlink(f.name)
 
+    def test_language_tests_css(self):
+        """Test language detection for CSS files."""
+        with tempfile.NamedTemporaryFile(mode="w", delete=False) as f:
+            f.write("body {\n  color: red;\n}\n")
+            f.flush()
+
+            result = self.tester.language_tests(f.name)
+            assert result == "CSS stylesheet"
+
+            os.unlink(f.name)
+
+    def test_language_tests_weak_patterns_need_literals(self):
+        """Test that CSS and Markdown need more than a loose line match."""
+        with tempfile.NamedTemporaryFile(mode="w", delete=False) as f:
+            # A colon line without braces, and a list without a heading
+            f.write("name: value\n* item one\n1. item two\n")
+            f.flush()
+
+            result = self.tester.language_tests(f.name)
+            assert result == "text file"
+
+            os.unlink(f.name)
+
+    def test_language_tests_pattern_order_precedence(self):
+        """Test that earlier patterns win even when they match later in the file."""
+        with tempfile.NamedTemporaryFile(mode="w", delete=False) as f:
+            # Shell shebang comes first, but Python is earlier in the table
+            f.write("#!/bin/bash\necho 'hello'\nimport os\n")
+            f.flush()
+
+            result = self.tester.language_tests(f.name)
+            assert result == "Python script"
+
+            os.unlink(f.name)
+
+    def test_language_tests_patterns_anchored_to_line_start(self):
+        """Test that language patterns only match at the start of a line."""
+        with tempfile.NamedTemporaryFile(mode="w", delete=False) as f:
+            f.write('see #!/bin/bash and $x = 1 for details\n  "key": 1\n')
+            f.flush()
+
+            result = self.tester.language_tests(f.name)
+            assert result == "text file"
+
+            os.unlink(f.name)
+
+    def test_language_regex_re2_matches_re(self):
+        """Test that the RE2 combined pattern finds the same match as re."""
+        pytest.importorskip("re2")
+        samples = [
+            b"#!/bin/bash\nimport os\n",
+            b"x = 1\n  const y = 2\n",
+            b"data\n  key-1 : 1\n",
+            b"#\x1cbash\n",
+            b"import\x0bos\n",
+            b"plain words only\n",
+        ]
+        for content in samples:
+            expected = self.tester._language_regex.search(content)
+            actual = self.tester._language_regex_re2.search(content)
+            assert (actual and actual.lastindex) == (
+                expected and expected.lastindex
+            ), repr(content)
+
     def test_language_tests_text_file(self):
         """Test language detection for generic text files."""
         with tempfile.NamedTemporaryFile(mode="w", delete=False) as f:
@@ -225,6 +485,43 @@ class TestFileTypeTester:
 
             os.unlink(f.name)
 
+    def test_language_tests_skips_nul_bytes(self):
+        """Test that content with a NUL byte near the start is not matched."""
+        with tempfile.NamedTemporaryFile(mode="wb", delete=False) as f:
+            f.write(b"import os\n\x00" + b"print('hello')\n" * 20)
+            f.flush()
+
+            result = self.tester.language_tests(f.name)
+            assert result is None
+
+            os.unlink(f.name)
+
+    def test_language_tests_non_ascii_text_file(self):
+        """Test that UTF-8 text is counted by character, not by byte."""
+        with tempfile.NamedTemporaryFile(mode="wb", delete=False) as f:
+            f.write("\u65e5\u672c\u8a9e\u306e\u30c6\u30ad\u30b9\u30c8".encode("utf-8"))
+            f.flush()
+
+            result = self.tester.language_tests(f.name)
+            assert result == "text file"
+
+            os.unlink(f.name)
+
+    def test_language_tests_header_is_1024_characters(self):
+        """Test that the header holds 1024 characters, not 1024 bytes."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            # 1200 bytes of UTF-8, but only 401 characters before the markup
+            wide = os.path.join(tmpdir, "wide")
+            with open(wide, "wb") as f:
+                f.write(("\u65e5" * 400 + "\n<?xml version='1.0'?>\n").encode())
+            assert self.tester.language_tests(wide) == "XML document"
+
+            # Content after the first 1024 characters is not looked at
+            long = os.path.join(tmpdir, "long")
+            with open(long, "wb") as f:
+                f.write(b"x" * 1024 + b"\nimport os\n")
+            assert self.tester.language_tests(long) == "text file"
+
     def test_detect_file_type_nonexistent(self):
         """Test detect_file_type with non-existent file."""
         result, test_category = self.tester.detect_file_type("/nonexistent/file.txt")
@@ -243,6 +540,59 @@ class TestFileTypeTester:
 
             os.unlink(f.name)
 
+    def test_detect_file_type_known_extension_skips_content_tests(self):
+        """Test that a known extension never reaches magic or language tests."""
+        with tempfile.NamedTemporaryFile(mode="w", delete=False, suffix=".py") as f:
+            f.write("print('hello')")
+            f.flush()
+
+            with unittest.mock.patch.object(self.tester, "magic_tests") as magic:
+                with unittest.mock.patch.object(
+                    self.tester, "language_tests"
+                ) as language:
+                    result, _ = self.tester.detect_file_type(f.name)
+                    assert result == "Python script"
+                    magic.assert_not_called()
+                    language.assert_not_called()
+
+            os.unlink(f.name)
+
+    def test_detect_file_type_single_lstat(self):
+        """Test that detection looks up a regular file's metadata only once."""
+        with tempfile.NamedTemporaryFile(mode="w", delete=False) as f:
+            f.write("plain words\n")
+
+        with unittest.mock.patch("os.lstat", wraps=os.lstat) as lstat:
+            with unittest.mock.patch("os.stat", wraps=os.stat) as stat:
+                result, _ = self.tester.detect_file_type(f.name)
+
+        assert result
+        assert lstat.call_count == 1
+        assert stat.call_count == 0
+
+        os.unlink(f.name)
+
+    def test_detect_file_type_shares_open_file(self):
+        """Test that magic and language tests share one open file."""
+        with tempfile.NamedTemporaryFile(mode="w", delete=False) as f:
+            f.write("plain content")
+            f.flush()
+
+            with unittest.mock.patch.object(
+                self.tester, "magic_tests", return_value=None
+            ) as magic:
+                with unittest.mock.patch.object(
+                    self.tester, "language_tests", return_value=None
+                ) as language:
+                    self.tester.detect_file_type(f.name)
+
+                    fileobj = magic.call_args[1]["fileobj"]
+                    assert fileobj is not None
+                    assert language.call_args[1]["fileobj"] is fileobj
+                    assert fileobj.closed
+
+            os.unlink(f.name)
+
     def test_detect_file_type_fallback(self):
         """Test detect_file_type fallback to unknown."""
         with tempfile.NamedTemporaryFile(mode="wb", delete=False) as f:
@@ -299,6 +649,17 @@ class TestMain:
             captured = capsys.readouterr()
             assert fft.__version__ in captured.out
 
+    def test_main_version_does_not_load_libmagic(self):
+        """Test --version exits without creating a FileTypeTester."""
+        import sys
+
+        with unittest.mock.patch.object(sys, "argv", ["fft.py", "--version"]):
+            with unittest.mock.patch("fft.FileTypeTester") as mock_tester:
+                with pytest.raises(SystemExit):
+                    fft.main()
+
+        mock_tester.assert_not_called()
+
     def test_main_brief_mode(self, capsys):
         """Test main function with brief mode."""
         import sys
@@ -387,6 +748,65 @@ class TestMain:
 
             os.unlink(f1.name)
 
+    def test_main_with_many_files_in_parallel(self, capsys):
+        """Test that long file lists run on a thread pool and keep their order."""
+        contents = ["import os\n", "const x = 1;\n", "plain words\n", "# Title\n"]
+        with tempfile.TemporaryDirectory() as tmpdir:
+            paths = []
+            for index in range(20):
+                path = os.path.join(tmpdir, f"file{index:02d}")
+                with open(path, "w") as f:
+                    f.write(contents[index % len(contents)])
+                paths.append(path)
+            missing = os.path.join(tmpdir, "missing")
+            args = paths[:10] + [missing] + paths[10:]
+
+            with unittest.mock.patch.object(sys, "argv", ["fft.py", "-b"] + args):
+                fft.main()
+            serial = capsys.readouterr().out
+
+            with unittest.mock.patch.object(
+                sys, "argv", ["fft.py", "-b"] + args
+            ), unittest.mock.patch("os.cpu_count", return_value=4), unittest.mock.patch(
+                "concurrent.futures.ThreadPoolExecutor",
+                wraps=concurrent.futures.ThreadPoolExecutor,
+            ) as executor:
+                fft.main()
+            parallel = capsys.readouterr().out
+
+            assert executor.called
+            assert parallel == serial
+            lines = parallel.splitlines()
+            assert len(lines) == 21
+            assert "does not exist" in lines[10]
+            tester = fft.FileTypeTester()
+            expected = [tester.detect_file_type(path)[0] for path in paths]
+            assert lines[:10] + lines[11:] == expected
+
+    def test_main_writes_results_in_one_batch(self, capsys):
+        """Test that result lines are written to stdout in a single write."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            paths = []
+            for name in ("a.py", "b.js", "c.txt"):
+                path = os.path.join(tmpdir, name)
+                Path(path).write_text("x\n")
+                paths.append(path)
+
+            with unittest.mock.patch.object(
+                sys, "argv", ["fft.py"] + paths
+            ), unittest.mock.patch.object(
+                sys.stdout, "write", wraps=sys.stdout.write
+            ) as write:
+                fft.main()
+
+            assert write.call_count == 1
+            captured = capsys.readouterr()
+            assert captured.out.splitlines() == [
+                f"{paths[0]}: Python script",
+                f"{paths[1]}: JavaScript file",
+                f"{paths[2]}: text file",
+            ]
+
 
 class TestDirectoryProcessing:
     """Test cases for directory processing functionality."""
@@ -588,6 +1008,67 @@ class TestDirectoryProcessing:
             assert any(os.path.join("subdir", "file2.py") in f for f in files)
             assert any(os.path.join("subdir", "nested", "file3.js") in f for f in files)
 
+    def test_directory_scan_skips_symlinked_directories(self, capsys):
+        """Test directory scans list nested files but not symlinked dirs."""
+        import sys
+        import tempfile
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            nested = os.path.join(tmpdir, "sub", "nested")
+            os.makedirs(nested)
+            with open(os.path.join(nested, "file.py"), "w") as f:
+                f.write("print('test')")
+            os.symlink(os.path.join(tmpdir, "sub"), os.path.join(tmpdir, "linked"))
+            os.symlink("missing", os.path.join(tmpdir, "broken"))
+
+            with unittest.mock.patch.object(sys, "argv", ["fft.py", "-h", tmpdir]):
+                fft.main()
+
+            captured = capsys.readouterr()
+            assert captured.out.splitlines() == [
+                f"{os.path.join(tmpdir, 'broken')}: symbolic link",
+                f"{os.path.join(nested, 'file.py')}: Python script",
+            ]
+
+    def test_directory_scan_with_symlink_loop(self, capsys):
+        """Test that looping symlinks are listed, as os.walk lists them."""
+        import sys
+        import tempfile
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            os.symlink("loop2", os.path.join(tmpdir, "loop1"))
+            os.symlink("loop1", os.path.join(tmpdir, "loop2"))
+            with open(os.path.join(tmpdir, "file.py"), "w") as f:
+                f.write("print('test')")
+
+            with unittest.mock.patch.object(sys, "argv", ["fft.py", "-h", tmpdir]):
+                fft.main()
+
+            captured = capsys.readouterr()
+            assert captured.out.splitlines() == [
+                f"{os.path.join(tmpdir, 'file.py')}: Python script",
+                f"{os.path.join(tmpdir, 'loop1')}: symbolic link",
+                f"{os.path.join(tmpdir, 'loop2')}: symbolic link",
+            ]
+
+    def test_dirent_mode(self):
+        """Test _dirent_mode gives the file type of directory entries."""
+        import stat
+        import tempfile
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            os.makedirs(os.path.join(tmpdir, "dir"))
+            with open(os.path.join(tmpdir, "file"), "w") as f:
+                f.write("test")
+            os.symlink("file", os.path.join(tmpdir, "link"))
+
+            with os.scandir(tmpdir) as it:
+                modes = {entry.name: fft._dirent_mode(entry) for entry in it}
+
+        assert stat.S_ISDIR(modes["dir"])
+        assert stat.S_ISREG(modes["file"])
+        assert stat.S_ISLNK(modes["link"])
+
 
 class TestDebugFunctionality:
     """Test cases for debug functionality."""
@@ -697,7 +1178,7 @@ class TestDebugFunctionality:
 
             captured = capsys.readouterr()
             assert "DEBUG: Running language tests" in captured.err
-            assert "DEBUG: Read" in captured.err and "characters from" in captured.err
+            assert "DEBUG: Read" in captured.err and "bytes from" in captured.err
 
             os.unlink(f.name)
 
@@ -1545,6 +2026,29 @@ class TestFilesFromFunctionality:
                 os.unlink(namefile.name)
             os.unlink(py_file.name)
 
+    def test_files_from_processed_in_batches(self, capsys):
+        """Test that a namefile longer than one batch keeps every name in order."""
+        import sys
+        import tempfile
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            names = [os.path.join(tmpdir, f"file{i}.py") for i in range(5)]
+            for name in names:
+                with open(name, "w") as f:
+                    f.write("print('hello')")
+            namefile = os.path.join(tmpdir, "names")
+            with open(namefile, "w") as f:
+                f.write("\n".join(names) + "\n")
+
+            with unittest.mock.patch.object(fft, "_NAMEFILE_BATCH_SIZE", 2):
+                with unittest.mock.patch.object(
+                    sys, "argv", ["fft.py", "-f", namefile]
+                ):
+                    fft.main()
+
+        captured = capsys.readouterr()
+        assert captured.out.splitlines() == [f"{name}: Python script" for name in names]
+
     def test_files_from_nonexistent_namefile(self, capsys):
         """Test error handling for nonexistent namefile."""
         import sys
@@ -2161,7 +2665,7 @@ class TestMimeFunctionality:
             f.flush()
 
             with unittest.mock.patch.object(
-                tester.mime_detector, "from_file", return_value="text/plain"
+                tester.mime_detector, "from_descriptor", return_value="text/plain"
             ):
                 result = tester.magic_tests(f.name)
                 assert result == "text/plain"